@@ -0,0 +1,243 @@
+# identity.py
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+
+import requests
+
+import config
+
+# Constants
+PROFILES_BATCH_SIZE = 25       # app.bsky.actor.getProfiles accepts at most 25 actors per call
+DEFAULT_MAX_ENTRIES = 10000    # Upper bound on cached identities
+DEFAULT_TTL_SECONDS = 6 * 3600 # Handles can change, so entries expire after a few hours
+NEGATIVE_TTL_SECONDS = 300     # "Not found" answers are remembered briefly to avoid repeating them
+
+
+class IdentityCache:
+    """
+    Bounded LRU + TTL cache mapping handles <-> DIDs.
+
+    Each identity is stored once under its DID; a secondary index maps
+    lowercased handles back to the DID. Misses are resolved in bulk through
+    app.bsky.actor.getProfiles (25 actors per request) when an auth token is
+    available; handles still unresolved afterwards (or without a token) fall
+    back to com.atproto.identity.resolveHandle. Actors the server reports as
+    not found are negatively cached for a short time; transport errors are not.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL_SECONDS,
+                 negative_ttl: float = NEGATIVE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # did -> (handle, expires_at)
+        self._handles = {}             # handle -> did
+        self._misses = OrderedDict()   # handle or did -> expires_at, for failed lookups
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Raw cache access
+    # -------------------------------------------------------------------------
+    def put(self, did: str, handle: str) -> None:
+        """Record a DID/handle pair, evicting the least recently used entry if full."""
+        if not did or not handle:
+            return
+        handle = handle.lower()
+        with self._lock:
+            old = self._entries.pop(did, None)
+            if old and self._handles.get(old[0]) == did:
+                del self._handles[old[0]]
+            self._entries[did] = (handle, time.monotonic() + self.ttl)
+            self._handles[handle] = did
+            self._misses.pop(did, None)
+            self._misses.pop(handle, None)
+            while len(self._entries) > self.max_entries:
+                evicted_did, (evicted_handle, _) = self._entries.popitem(last=False)
+                if self._handles.get(evicted_handle) == evicted_did:
+                    del self._handles[evicted_handle]
+
+    def get_handle(self, did: str) -> Optional[str]:
+        """Return the cached handle for a DID, or None if missing/expired."""
+        with self._lock:
+            entry = self._entries.get(did)
+            if entry is None:
+                return None
+            handle, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[did]
+                if self._handles.get(handle) == did:
+                    del self._handles[handle]
+                return None
+            self._entries.move_to_end(did)
+            return handle
+
+    def get_did(self, handle: str) -> Optional[str]:
+        """Return the cached DID for a handle, or None if missing/expired."""
+        if not handle:
+            return None
+        with self._lock:
+            did = self._handles.get(handle.lower())
+        if did is None:
+            return None
+        # get_handle() takes care of expiry and LRU bookkeeping
+        if self.get_handle(did) != handle.lower():
+            return None
+        return did
+
+    def put_miss(self, key: str) -> None:
+        """Remember that a handle or DID does not exist, for negative_ttl seconds."""
+        if not key:
+            return
+        with self._lock:
+            self._misses.pop(key, None)
+            self._misses[key] = time.monotonic() + self.negative_ttl
+            while len(self._misses) > self.max_entries:
+                self._misses.popitem(last=False)
+
+    def is_miss(self, key: str) -> bool:
+        """Return True if this handle or DID was recently reported as not found."""
+        with self._lock:
+            expires_at = self._misses.get(key)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._misses[key]
+                return False
+            return True
+
+    def prime_from_profiles(self, profiles: Iterable[Dict]) -> None:
+        """Populate the cache from profile views (e.g. post authors in searchPosts results)."""
+        for profile in profiles:
+            if profile:
+                self.put(profile.get("did", ""), profile.get("handle", ""))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._handles.clear()
+            self._misses.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # -------------------------------------------------------------------------
+    # Bulk resolution
+    # -------------------------------------------------------------------------
+    def resolve_handles(self, handles: Iterable[str], auth_token: Optional[str] = None) -> Dict[str, str]:
+        """
+        Resolve handles to DIDs, hitting the network only for cache misses.
+
+        Returns:
+            Dict[str, str]: handle (as given, with a leading '@' stripped) -> DID.
+                            Handles that could not be resolved are omitted.
+        """
+        resolved = {}
+        misses = []
+        for handle in handles:
+            handle = (handle or "").strip().lstrip("@")
+            if not handle or handle in resolved:
+                continue
+            did = self.get_did(handle)
+            if did:
+                resolved[handle] = did
+            elif not self.is_miss(handle.lower()):
+                misses.append(handle)
+
+        answered = self._fetch_profiles(misses, auth_token) if misses and auth_token else set()
+        for handle in misses:
+            did = self.get_did(handle)
+            if not did and handle in answered:
+                # getProfiles succeeded but did not return this handle
+                self.put_miss(handle.lower())
+                continue
+            if not did:
+                # getProfiles failed or was unavailable; try the unauthenticated lookup
+                did = _resolve_handle(handle)
+                if did:
+                    self.put(did, handle)
+                elif did == "":
+                    self.put_miss(handle.lower())
+            if did:
+                resolved[handle] = did
+        return resolved
+
+    def resolve_dids(self, dids: Iterable[str], auth_token: Optional[str] = None) -> Dict[str, str]:
+        """
+        Resolve DIDs to handles, hitting the network only for cache misses.
+
+        Without an auth token only cached entries are returned, since
+        getProfiles requires an authenticated session.
+        """
+        resolved = {}
+        misses = []
+        for did in dids:
+            if not did or did in resolved:
+                continue
+            handle = self.get_handle(did)
+            if handle:
+                resolved[did] = handle
+            elif not self.is_miss(did):
+                misses.append(did)
+
+        if misses and auth_token:
+            answered = self._fetch_profiles(misses, auth_token)
+            for did in misses:
+                handle = self.get_handle(did)
+                if handle:
+                    resolved[did] = handle
+                elif did in answered:
+                    self.put_miss(did)
+        return resolved
+
+    def _fetch_profiles(self, actors: List[str], auth_token: str) -> Set[str]:
+        """
+        Look up actors (handles or DIDs) via getProfiles in batches and cache the results.
+
+        Returns:
+            Set[str]: Actors whose batch got a successful response, so a missing
+                      profile among them means the actor was not found.
+        """
+        url = f"{config.BASE_URL}/app.bsky.actor.getProfiles"
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        answered = set()
+        for start in range(0, len(actors), PROFILES_BATCH_SIZE):
+            batch = actors[start:start + PROFILES_BATCH_SIZE]
+            try:
+                response = requests.get(url, headers=headers, params={"actors": batch}, timeout=30)
+                response.raise_for_status()
+                self.prime_from_profiles(response.json().get("profiles", []))
+                answered.update(batch)
+            except requests.exceptions.RequestException as e:
+                logging.warning(f"getProfiles failed for {len(batch)} actor(s): {e}")
+            except (KeyError, ValueError) as e:
+                logging.warning(f"Error parsing getProfiles response: {e}")
+        return answered
+
+
+def _resolve_handle(handle: str) -> Optional[str]:
+    """
+    Unauthenticated single-handle lookup via com.atproto.identity.resolveHandle.
+
+    Returns:
+        Optional[str]: The DID, "" if the server says the handle does not exist (HTTP 400),
+                       or None if the lookup itself failed (network error, 5xx, bad response).
+    """
+    url = f"{config.BASE_URL}/com.atproto.identity.resolveHandle"
+    try:
+        resp = requests.get(url, params={"handle": handle}, timeout=30)
+        if resp.status_code == 400:
+            logging.warning(f"Handle {handle} does not exist.")
+            return ""
+        resp.raise_for_status()
+        return resp.json().get("did") or None
+    except Exception as e:
+        logging.warning(f"Could not resolve handle {handle} to DID: {e}")
+        return None
+
+
+# Shared instance used by config saving, results rendering and block requests
+identity_cache = IdentityCache()
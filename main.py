@@ -3,14 +3,33 @@ import datetime
 import re
 import logging
 import json
-from typing import Optional, Dict, List
+import math
+import argparse
+import threading
+from typing import Optional, Dict, List, Iterable, Iterator, Tuple
 from config import BASE_URL, APP_PASSWORD, USERNAME, BLOCKLIST_URI, TARGET_KEYWORDS
+from replay import iter_replay_posts, JsonlVerdictSink
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 # Constants
 OLLAMA_URL = "http://localhost:11434/api/generate"  # Ollama API endpoint
+CLASSIFIER_MODEL = "deepseek-r1:8b"       # Slow reasoning model; makes every decision that leads to a block
+FAST_CLASSIFIER_MODEL = "llama3.2:3b"     # Small first-pass model; set to None to send everything to CLASSIFIER_MODEL
+ESCALATION_CONFIDENCE = 0.8               # Fast-model verdicts below this confidence are escalated
+REPLAY_SEED = 42                          # Fixed sampling seed so replay runs are reproducible
+
+# Sampling options sent with every Ollama request (replay mode pins these for determinism)
+OLLAMA_OPTIONS = {
+    "temperature": 0.2,  # Lower temperature for deterministic output
+    "top_p": 0.9,        # Restrict sampling
+    "max_tokens": 5000    # Maximum tokens to generate
+}
+
+# Cascade statistics (shared across Flask request threads)
+cascade_stats = {"classified": 0, "escalated": 0}
+cascade_stats_lock = threading.Lock()
 
 def get_session():
     """Authenticate using app password and get session tokens."""
@@ -83,11 +102,7 @@ def send_request(model: str, prompt: str) -> Dict:
     payload = {
         "model": model,
         "prompt": prompt,
-        "options": {
-            "temperature": 0.2,  # Lower temperature for deterministic output
-            "top_p": 0.9,        # Restrict sampling
-            "max_tokens": 5000    # Maximum tokens to generate
-        },
+        "options": dict(OLLAMA_OPTIONS),
         "stream": False
     }
     try:
@@ -138,7 +153,8 @@ def generate_image_description(image_url: str) -> Optional[str]:
         logging.warning("Failed to generate image description.")
         return None
 
-def classify_content(text: Optional[str], image_description: Optional[str], keyword: str) -> Dict:
+def classify_content(text: Optional[str], image_description: Optional[str], keyword: str,
+                     model: Optional[str] = None, with_confidence: bool = False) -> Dict:
     """
     Classify the content's intent regarding the specified keyword.
 
@@ -146,9 +162,11 @@ def classify_content(text: Optional[str], image_description: Optional[str], keyw
         text (Optional[str]): The textual content of the post.
         image_description (Optional[str]): Description of the image content.
         keyword (str): The keyword to evaluate support against.
+        model (Optional[str]): The Ollama model to classify with (defaults to CLASSIFIER_MODEL).
+        with_confidence (bool): Ask the model for a 0-1 confidence score as well.
 
     Returns:
-        dict: Classification result with 'intent' and 'reasoning'.
+        dict: Classification result with 'intent', 'reasoning', 'confidence' and 'model'.
     """
     classification_prompt = (
         "You are a proficient content moderator. Analyze the following post to determine its intent "
@@ -158,7 +176,7 @@ def classify_content(text: Optional[str], image_description: Optional[str], keyw
         "Ensure the output is valid JSON in the specified format only:\n"
         "{\n"
         '  "intent": "supportive" | "critical" | "informative/reporting",\n'
-        '  "reasoning": "Detailed explanation."\n'
+        '  "reasoning": "Detailed explanation."' + (',\n  "confidence": 0.0 to 1.0\n' if with_confidence else "\n") +
         "}\n\n"
     )
     
@@ -167,19 +185,77 @@ def classify_content(text: Optional[str], image_description: Optional[str], keyw
     if image_description:
         classification_prompt += f"Image Description: {image_description}\n"
 
-    response = send_request("deepseek-r1:8b", classification_prompt)
-    intent = response.get("intent", "").lower().strip()
-    reasoning = response.get("reasoning", "").strip()
+    model = model or CLASSIFIER_MODEL
+    response = send_request(model, classification_prompt)
+    intent = str(response.get("intent", "")).lower().strip()
+    reasoning = str(response.get("reasoning", "")).strip()
+    try:
+        # Without an explicit score, a slow-model verdict is taken at face value
+        confidence = float(response.get("confidence", 0.0 if with_confidence else 1.0))
+        confidence = min(max(confidence, 0.0), 1.0) if math.isfinite(confidence) else 0.0
+    except (TypeError, ValueError):
+        confidence = 0.0
 
     if intent not in {"supportive", "critical", "informative/reporting"}:
         logging.warning(f"Unexpected intent classification: {intent}")
         intent = "unknown"
         reasoning = "Invalid intent classification returned."
+        confidence = 0.0
 
     # Log the classification details
-    logging.info(f"Classification Result - Intent: {intent}, Reasoning: {reasoning}")
+    logging.info(f"Classification Result ({model}) - Intent: {intent}, Confidence: {confidence:.2f}, Reasoning: {reasoning}")
+
+    return {"intent": intent, "reasoning": reasoning, "confidence": confidence, "model": model}
+
+def classify_with_cascade(text: Optional[str], image_description: Optional[str], keyword: str) -> Dict:
+    """
+    Classify with FAST_CLASSIFIER_MODEL first and escalate to CLASSIFIER_MODEL when needed.
 
-    return {"intent": intent, "reasoning": reasoning}
+    A fast verdict is accepted only if it is confidently 'critical' or 'informative/reporting'.
+    Low-confidence, unknown and 'supportive' verdicts (the ones that lead to a block) are
+    re-classified by the slow model.
+
+    Returns:
+        dict: Classification result with 'intent', 'reasoning', 'confidence', 'model' and 'escalated'.
+    """
+    if not FAST_CLASSIFIER_MODEL:
+        result = classify_content(text, image_description, keyword)
+        result["escalated"] = False
+        return result
+
+    result = classify_content(text, image_description, keyword,
+                              model=FAST_CLASSIFIER_MODEL, with_confidence=True)
+    escalate = result["intent"] in {"supportive", "unknown"} or result["confidence"] < ESCALATION_CONFIDENCE
+
+    with cascade_stats_lock:
+        cascade_stats["classified"] += 1
+        if escalate:
+            cascade_stats["escalated"] += 1
+
+    if escalate:
+        logging.info(f"Escalating to {CLASSIFIER_MODEL} (fast intent: {result['intent']}, confidence: {result['confidence']:.2f}).")
+        result = classify_content(text, image_description, keyword)
+    result["escalated"] = escalate
+    return result
+
+def get_cascade_stats() -> Dict:
+    """Return how many classifications went through the cascade and how many were escalated."""
+    with cascade_stats_lock:
+        classified = cascade_stats["classified"]
+        escalated = cascade_stats["escalated"]
+    return {
+        "classified": classified,
+        "escalated": escalated,
+        "escalation_rate": escalated / classified if classified else 0.0
+    }
+
+def log_cascade_stats(since: Dict) -> None:
+    """Log the escalations recorded since the given get_cascade_stats() snapshot (e.g. for one scan)."""
+    now = get_cascade_stats()
+    classified = now["classified"] - since["classified"]
+    escalated = now["escalated"] - since["escalated"]
+    rate = escalated / classified if classified else 0.0
+    logging.info(f"Cascade: {escalated}/{classified} classifications escalated ({rate:.0%}).")
 
 def validate_with_ollama(content: Optional[str], keyword: str, image_url: Optional[str] = None) -> Dict:
     """
@@ -191,7 +267,7 @@ def validate_with_ollama(content: Optional[str], keyword: str, image_url: Option
         image_url (Optional[str]): The URL of the image to evaluate.
 
     Returns:
-        dict: Contains 'is_supportive', 'intent', and 'reasoning'.
+        dict: Contains 'is_supportive', 'intent', 'reasoning', 'model' and 'escalated'.
     """
     logging.info("Starting validation with Ollama.")
 
@@ -212,7 +288,7 @@ def validate_with_ollama(content: Optional[str], keyword: str, image_url: Option
             logging.warning("Proceeding without image description due to generation failure.")
 
     # Step 3: Content Classification
-    classification_result = classify_content(content, image_description, keyword)
+    classification_result = classify_with_cascade(content, image_description, keyword)
     intent = classification_result.get("intent", "unknown")
     reasoning = classification_result.get("reasoning", "No reasoning provided.")
 
@@ -231,76 +307,93 @@ def validate_with_ollama(content: Optional[str], keyword: str, image_url: Option
     return {
         "is_supportive": is_supportive,
         "intent": intent,
-        "reasoning": reasoning
+        "reasoning": reasoning,
+        "model": classification_result.get("model"),
+        "escalated": classification_result.get("escalated", False)
     }
 
-def monitor_and_block(auth_token: str, session_did: str) -> List[str]:
+def live_posts(auth_token: str) -> Iterator[Tuple[str, Dict]]:
+    """Yield (keyword, post) pairs by searching Bluesky for each target keyword."""
+    for keyword in TARGET_KEYWORDS:
+        logging.info(f"Searching for keyword: {keyword}")
+        for post in search_posts(auth_token, keyword):
+            yield keyword, post
+
+def monitor_and_block(auth_token: Optional[str], session_did: Optional[str],
+                      posts: Optional[Iterable[Tuple[str, Dict]]] = None,
+                      sink: Optional[JsonlVerdictSink] = None) -> List[str]:
     """
     Monitor posts for target keywords, validate them, and identify users who are supportive/in agreement with the ideas/concept of the keyword.
 
     Parameters:
-        auth_token (str): Authentication token for API access.
-        session_did (str): DID of the session user.
+        auth_token (Optional[str]): Authentication token for API access (unused when posts are supplied).
+        session_did (Optional[str]): DID of the session user.
+        posts (Optional[Iterable[Tuple[str, Dict]]]): (keyword, post) pairs to evaluate, e.g. from
+            replay.iter_replay_posts. Defaults to a live search for every target keyword.
+        sink (Optional[JsonlVerdictSink]): If given, every verdict is also written to it.
 
     Returns:
         List[str]: List of user DIDs who are supportive of the target keywords.
     """
     logging.info("Starting monitoring and blocking process.")
     found_users = set()
-
-    for keyword in TARGET_KEYWORDS:
-        logging.info(f"Searching for keyword: {keyword}")
-        posts = search_posts(auth_token, keyword)
-
-        for post in posts:
-            user_did = post.get("author", {}).get("did")
-            content = post.get("record", {}).get("text", post.get("content", ""))
-            images = post.get("media", [])  # Assuming 'media' contains image URLs
-
-            if not user_did or (not content and not images):
-                logging.warning("Invalid post structure; skipping.")
-                continue
-
-            logging.info(f"Processing post by user {user_did} for keyword '{keyword}'.")
-
-            # Initialize validation result
-            validation_result = {
-                "is_supportive": False,
-                "intent": "unknown",
-                "reasoning": "No analysis performed."
-            }
-
-            # Validate text content
-            if content:
-                logging.info(f"Validating text content for user {user_did}.")
-                result = validate_with_ollama(content, keyword)
-                logging.info(f"Ollama reasoning for text by user {user_did}: {result['reasoning']}")
-                if result["is_supportive"]:
-                    validation_result = result
+    stats_before = get_cascade_stats()
+
+    if posts is None:
+        posts = live_posts(auth_token)
+
+    for keyword, post in posts:
+        user_did = (post.get("author") or {}).get("did")
+        content = (post.get("record") or {}).get("text", post.get("content", ""))
+        images = post.get("media") or []  # Assuming 'media' contains image URLs
+
+        if not user_did or (not content and not images):
+            logging.warning("Invalid post structure; skipping.")
+            continue
+
+        logging.info(f"Processing post by user {user_did} for keyword '{keyword}'.")
+
+        # Initialize validation result
+        validation_result = {
+            "is_supportive": False,
+            "intent": "unknown",
+            "reasoning": "No analysis performed."
+        }
+
+        # Validate text content
+        if content:
+            logging.info(f"Validating text content for user {user_did}.")
+            result = validate_with_ollama(content, keyword)
+            logging.info(f"Ollama reasoning for text by user {user_did}: {result['reasoning']}")
+            validation_result = result
+            if not result["is_supportive"]:
+                # If not supportive, proceed to check images
+                logging.info(f"Text content does not indicate support for keyword '{keyword}'.")
+
+        # Validate images if text is not supportive
+        if not validation_result["is_supportive"] and images:
+            for image_url in images:
+                logging.info(f"Validating image {image_url} for user {user_did}.")
+                img_result = validate_with_ollama(None, keyword, image_url=image_url)
+                logging.info(f"Ollama reasoning for image {image_url} by user {user_did}: {img_result['reasoning']}")
+                if img_result["is_supportive"]:
+                    validation_result = img_result
+                    logging.info(f"Image {image_url} indicates support for keyword '{keyword}'.")
+                    break  # Stop checking other images if supportive
                 else:
-                    # If not supportive, proceed to check images
-                    logging.info(f"Text content does not indicate support for keyword '{keyword}'.")
-
-            # Validate images if text is not supportive
-            if not validation_result["is_supportive"] and images:
-                for image_url in images:
-                    logging.info(f"Validating image {image_url} for user {user_did}.")
-                    img_result = validate_with_ollama(None, keyword, image_url=image_url)
-                    logging.info(f"Ollama reasoning for image {image_url} by user {user_did}: {img_result['reasoning']}")
-                    if img_result["is_supportive"]:
-                        validation_result = img_result
-                        logging.info(f"Image {image_url} indicates support for keyword '{keyword}'.")
-                        break  # Stop checking other images if supportive
-                    else:
-                        logging.info(f"Image {image_url} does not indicate support for keyword '{keyword}'.")
-
-            # Decision based on validation results
-            if validation_result["is_supportive"]:
-                logging.info(f"User {user_did} supports the keyword '{keyword}'. Marking for blocking.")
-                found_users.add(user_did)
-            else:
-                logging.info(f"User {user_did} does not support the keyword '{keyword}'. Intent: {validation_result['intent']}.")
+                    logging.info(f"Image {image_url} does not indicate support for keyword '{keyword}'.")
 
+        # Decision based on validation results
+        if validation_result["is_supportive"]:
+            logging.info(f"User {user_did} supports the keyword '{keyword}'. Marking for blocking.")
+            found_users.add(user_did)
+        else:
+            logging.info(f"User {user_did} does not support the keyword '{keyword}'. Intent: {validation_result['intent']}.")
+
+        if sink is not None:
+            sink.write(keyword, post, validation_result)
+
+    log_cascade_stats(stats_before)
     logging.info(f"Monitoring complete. {len(found_users)} users found supportive of the target keywords.")
     return list(found_users)
 
@@ -318,13 +411,45 @@ def remove_all_users_from_blocklist(auth_token: str, session_did: str) -> int:
     ...
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan Bluesky posts and block users supportive of the target keywords.")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="Run offline over a recorded JSONL(.gz) dataset of searchPosts responses or raw posts.")
+    parser.add_argument("--output", metavar="PATH",
+                        help="Write one JSON verdict per evaluated post to this JSONL(.gz) file.")
+    parser.add_argument("--keyword",
+                        help="Replay only: evaluate posts without a 'keyword' field against this keyword "
+                             "instead of matching TARGET_KEYWORDS.")
+    parser.add_argument("--seed", type=int,
+                        help=f"Replay only: sampling seed for reproducible verdicts (default: {REPLAY_SEED}).")
+    args = parser.parse_args()
+
+    if not args.replay and (args.keyword is not None or args.seed is not None):
+        parser.error("--keyword and --seed can only be used with --replay")
+
+    if args.replay:
+        # Offline replay: no authentication, no blocking, deterministic sampling
+        seed = args.seed if args.seed is not None else REPLAY_SEED
+        OLLAMA_OPTIONS.update({"temperature": 0, "seed": seed})
+        posts = iter_replay_posts(args.replay, TARGET_KEYWORDS, default_keyword=args.keyword)
+        if args.output:
+            with JsonlVerdictSink(args.output) as sink:
+                found_users = monitor_and_block(None, None, posts=posts, sink=sink)
+        else:
+            found_users = monitor_and_block(None, None, posts=posts)
+        logging.info(f"Replay complete. {len(found_users)} supportive user(s) found.")
+        exit(0)
+
     try:
         ACCESS_TOKEN, SESSION_DID = get_session()
     except Exception as e:
         logging.critical(f"Exiting due to authentication failure: {e}")
         exit(1)
     
-    found_users = monitor_and_block(ACCESS_TOKEN, SESSION_DID)
+    if args.output:
+        with JsonlVerdictSink(args.output) as sink:
+            found_users = monitor_and_block(ACCESS_TOKEN, SESSION_DID, sink=sink)
+    else:
+        found_users = monitor_and_block(ACCESS_TOKEN, SESSION_DID)
     if found_users:
         confirm = input("Block these users? (yes/no): ").strip().lower()
         if confirm == "yes":
@@ -0,0 +1,135 @@
+# replay.py
+
+import gzip
+import json
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+def _open_text(path: str, mode: str):
+    """Open a plain or gzip-compressed (.gz) file in text mode."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _match_keyword(post: Dict, keywords: List[str]) -> Optional[str]:
+    """Return the first target keyword that appears in the post text, if any."""
+    record = post.get("record")
+    text = record.get("text") if isinstance(record, dict) else None
+    if not isinstance(text, str):
+        text = post.get("content") if isinstance(post.get("content"), str) else ""
+    text = text.lower()
+    for keyword in keywords:
+        if keyword.lower() in text:
+            return keyword
+    return None
+
+
+def iter_replay_posts(path: str, keywords: List[str],
+                      default_keyword: Optional[str] = None) -> Iterator[Tuple[str, Dict]]:
+    """
+    Stream (keyword, post) pairs from a recorded JSONL dataset.
+
+    Each line may be either a recorded searchPosts response ({"posts": [...]})
+    or a single raw post view. A "keyword" (or "q") field on the line is used
+    as the keyword for its posts; otherwise default_keyword is used if given,
+    else the post text is matched against the target keywords and unmatched
+    posts are skipped. A summary of skipped lines and posts is logged once the
+    dataset has been read.
+
+    Parameters:
+        path (str): Path to the dataset; files ending in .gz are decompressed on the fly.
+        keywords (List[str]): Target keywords used when a line carries none.
+        default_keyword (Optional[str]): Keyword for posts whose line carries none.
+
+    Yields:
+        Tuple[str, Dict]: The keyword and the post to evaluate against it.
+    """
+    yielded = 0
+    skipped_invalid = 0
+    skipped_unmatched = 0
+
+    with _open_text(path, "r") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logging.warning(f"Skipping malformed line {line_no} in {path}: {e}")
+                skipped_invalid += 1
+                continue
+            if not isinstance(record, dict):
+                logging.warning(f"Skipping non-object line {line_no} in {path}.")
+                skipped_invalid += 1
+                continue
+
+            line_keyword = record.get("keyword") or record.get("q")
+            if not isinstance(line_keyword, str):
+                line_keyword = None
+            posts = record.get("posts") if "posts" in record else [record]
+            if posts is None:
+                continue
+            if not isinstance(posts, list):
+                logging.warning(f"Skipping line {line_no} in {path}: 'posts' is not a list.")
+                skipped_invalid += 1
+                continue
+
+            for post in posts:
+                if not isinstance(post, dict):
+                    logging.warning(f"Skipping non-object post on line {line_no} in {path}.")
+                    skipped_invalid += 1
+                    continue
+                if any(field in post and not isinstance(post[field], dict) for field in ("author", "record")):
+                    logging.warning(f"Skipping post on line {line_no} in {path}: 'author' or 'record' is not an object.")
+                    skipped_invalid += 1
+                    continue
+                keyword = line_keyword or default_keyword or _match_keyword(post, keywords)
+                if not keyword:
+                    logging.debug(f"No target keyword in post {post.get('uri')}; skipping.")
+                    skipped_unmatched += 1
+                    continue
+                yielded += 1
+                yield keyword, post
+
+    logging.info(f"Replayed {yielded} post(s) from {path}.")
+    if skipped_invalid:
+        logging.warning(f"Skipped {skipped_invalid} malformed line(s) or post(s) in {path}.")
+    if skipped_unmatched:
+        logging.warning(f"Skipped {skipped_unmatched} post(s) in {path} that matched no target keyword "
+                        "(set a 'keyword' field per line or pass --keyword).")
+
+
+class JsonlVerdictSink:
+    """Write one JSON verdict per evaluated post to a (optionally gzip) JSONL file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = _open_text(path, "w")
+
+    def write(self, keyword: str, post: Dict, result: Dict) -> None:
+        verdict = {
+            "post_uri": post.get("uri"),
+            "authorDid": (post.get("author") or {}).get("did"),
+            "keyword": keyword,
+            "is_supportive": result["is_supportive"],
+            "intent": result["intent"],
+            "reasoning": result["reasoning"],
+            "model": result.get("model"),
+            "escalated": result.get("escalated", False),
+        }
+        self._file.write(json.dumps(verdict, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        self._file.close()
+        logging.info(f"Wrote {self.count} verdict(s) to {self.path}.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -3,20 +3,22 @@
 from flask import Flask, request, jsonify
 import logging
 import re
-import requests
 import io
 import datetime
 import json
 
 import main
 import config
+from identity import identity_cache
 
 from main import (
     get_session, 
     block_users, 
     remove_all_users_from_blocklist, 
     search_posts, 
-    validate_with_ollama
+    validate_with_ollama,
+    get_cascade_stats,
+    log_cascade_stats
 )
 
 from flask_cors import CORS  # Import Flask-CORS
@@ -51,7 +53,10 @@ scanned_posts = {}
 #       "reasoning": "...",
 #       "post_uri": "at://did:plc:xxx/app.bsky.feed.post/yyyy",
 #       "authorDid": "did:plc:xxx",
+#       "authorHandle": "someone.bsky.social",
 #       "content": "...",
+#       "model": "deepseek-r1:8b",
+#       "escalated": True,
 #   },
 #   ...
 # }
@@ -60,23 +65,15 @@ scanned_posts = {}
 # =============================================================================
 # HELPER: Resolve handle -> DID
 # =============================================================================
-def resolve_handle_to_did(handle: str) -> str:
+def resolve_handle_to_did(handle: str, auth_token: str = None) -> str:
     """
-    Calls identity.resolveHandle to get a DID from a handle 
+    Resolves a handle to a DID through the shared identity cache
     (mirroring the logic from your old gui.py).
     """
     if not handle:
         return ""
-    
-    url = f"{config.BASE_URL}/com.atproto.identity.resolveHandle?handle={handle}"
-    try:
-        resp = requests.get(url)
-        resp.raise_for_status()
-        data = resp.json()
-        return data.get("did", "")
-    except Exception as e:
-        logging.warning(f"Could not resolve handle {handle} to DID: {e}")
-        return ""
+    handle = handle.strip().lstrip("@")
+    return identity_cache.resolve_handles([handle], auth_token).get(handle, "")
 
 
 # =============================================================================
@@ -90,6 +87,14 @@ def get_logs():
     return log_stream.getvalue(), 200, {'Content-Type': 'text/plain'}
 
 
+# =============================================================================
+# /api/cascade-stats - Cumulative escalation counts since the server started
+# =============================================================================
+@app.route("/api/cascade-stats", methods=["GET"])
+def cascade_stats_endpoint():
+    return jsonify(get_cascade_stats())
+
+
 # =============================================================================
 # /api/config - Returns current config.py data
 # =============================================================================
@@ -217,6 +222,7 @@ def run_scan():
 
         # Clear old results
         scanned_posts.clear()
+        stats_before = get_cascade_stats()
 
         found_users = set()
 
@@ -224,6 +230,9 @@ def run_scan():
             logging.info(f"Searching for keyword: {keyword}")
             posts = search_posts(access_token, keyword)
 
+            # Authors come back as profile views, so cache their handles for free
+            identity_cache.prime_from_profiles(post.get("author") for post in posts)
+
             for post in posts:
                 user_did = post.get("author", {}).get("did")
                 content = post.get("record", {}).get("text", post.get("content", ""))
@@ -250,6 +259,8 @@ def run_scan():
                 if not is_supportive and images:
                     for image_url in images:
                         img_res = validate_with_ollama(None, keyword, image_url=image_url)
+                        if classification_result is None:
+                            classification_result = img_res
                         if img_res["is_supportive"]:
                             is_supportive = True
                             reasoning = img_res["reasoning"]
@@ -264,12 +275,16 @@ def run_scan():
                     "reasoning": reasoning,
                     "post_uri": post_uri,
                     "authorDid": user_did,
+                    "authorHandle": post.get("author", {}).get("handle", ""),
                     "content": content,
+                    "model": classification_result.get("model") if classification_result else None,
+                    "escalated": classification_result.get("escalated", False) if classification_result else False,
                 }
 
                 if is_supportive:
                     found_users.add(user_did)
 
+        log_cascade_stats(stats_before)
         logging.info(f"Scan complete. Found {len(found_users)} supportive user(s).")
         return jsonify({"foundUsers": list(found_users)})
 
@@ -285,6 +300,22 @@ def run_scan():
 def get_results():
     supportive = []
     oppose = []
+
+    # Fill in handles that were missing from the scanned posts
+    missing = {info["authorDid"] for info in scanned_posts.values() if not info.get("authorHandle")}
+    if missing:
+        handles = identity_cache.resolve_dids(missing)
+        unknown = [did for did in missing if did not in handles and not identity_cache.is_miss(did)]
+        if unknown:
+            try:
+                access_token, _ = main.get_session()
+                handles.update(identity_cache.resolve_dids(unknown, access_token))
+            except Exception as e:
+                logging.warning(f"Could not look up missing author handles: {e}")
+        for info in scanned_posts.values():
+            if not info.get("authorHandle") and info["authorDid"] in handles:
+                info["authorHandle"] = handles[info["authorDid"]]
+
     for unique_id, info in scanned_posts.items():
         if info["is_supportive"]:
             supportive.append(info)
@@ -342,8 +373,22 @@ def block_users_endpoint():
     try:
         access_token, session_did = main.get_session()
         main.SESSION_DID = session_did
+
+        # Accept handles as well as DIDs; resolve all handles in bulk
+        targets = [t.strip() for t in data["userDids"] if isinstance(t, str) and t.strip()]
+        handles = [t for t in targets if not t.startswith("did:")]
+        resolved = identity_cache.resolve_handles(handles, access_token)
+        user_dids = []
+        for target in targets:
+            if target.startswith("did:"):
+                user_dids.append(target)
+            elif resolved.get(target.lstrip("@")):
+                user_dids.append(resolved[target.lstrip("@")])
+            else:
+                logging.warning(f"Could not resolve {target} to a DID; skipping.")
+
         # Pass session_did as the third argument
-        blocked_count = block_users(access_token, data["userDids"], session_did)
+        blocked_count = block_users(access_token, user_dids, session_did)
         return jsonify({"blockedCount": blocked_count})
     except Exception as e:
         logging.error(f"Error blocking users: {e}")
@@ -0,0 +1,84 @@
+import logging
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """Replace send_request with canned per-model responses and record which models were called."""
+    calls = []
+    responses = {}
+
+    def send_request(model, prompt):
+        calls.append(model)
+        return dict(responses[model])
+
+    monkeypatch.setattr(main, "send_request", send_request)
+    monkeypatch.setattr(main, "FAST_CLASSIFIER_MODEL", "fast")
+    monkeypatch.setattr(main, "CLASSIFIER_MODEL", "slow")
+    responses["slow"] = {"intent": "critical", "reasoning": "slow verdict"}
+    return calls, responses
+
+
+def test_confident_non_supportive_verdict_is_accepted(fake_models):
+    calls, responses = fake_models
+    responses["fast"] = {"intent": "critical", "reasoning": "fast verdict", "confidence": 0.95}
+
+    result = main.classify_with_cascade("text", None, "kw")
+
+    assert calls == ["fast"]
+    assert result["intent"] == "critical"
+    assert result["model"] == "fast"
+    assert result["escalated"] is False
+
+
+@pytest.mark.parametrize("fast_response", [
+    {"intent": "supportive", "reasoning": "r", "confidence": 0.99},
+    {"intent": "critical", "reasoning": "r", "confidence": 0.5},
+    {"intent": "critical", "reasoning": "r"},
+    {"intent": "critical", "reasoning": "r", "confidence": "very"},
+    {"intent": "critical", "reasoning": "r", "confidence": float("nan")},
+    {"intent": "critical", "reasoning": "r", "confidence": "NaN"},
+    {"intent": "critical", "reasoning": "r", "confidence": float("inf")},
+    {"intent": "no idea", "reasoning": "r", "confidence": 0.99},
+])
+def test_uncertain_or_supportive_verdict_is_escalated(fake_models, fast_response):
+    calls, responses = fake_models
+    responses["fast"] = fast_response
+
+    result = main.classify_with_cascade("text", None, "kw")
+
+    assert calls == ["fast", "slow"]
+    assert result["model"] == "slow"
+    assert result["reasoning"] == "slow verdict"
+    assert result["escalated"] is True
+
+
+def test_cascade_disabled_uses_slow_model_only(fake_models, monkeypatch):
+    calls, _ = fake_models
+    monkeypatch.setattr(main, "FAST_CLASSIFIER_MODEL", None)
+
+    result = main.classify_with_cascade("text", None, "kw")
+
+    assert calls == ["slow"]
+    assert result["escalated"] is False
+
+
+def test_escalations_are_counted_per_scan(fake_models, caplog):
+    _, responses = fake_models
+    before = main.get_cascade_stats()
+
+    responses["fast"] = {"intent": "critical", "reasoning": "r", "confidence": 0.9}
+    main.classify_with_cascade("a", None, "kw")
+    responses["fast"] = {"intent": "supportive", "reasoning": "r", "confidence": 0.9}
+    main.classify_with_cascade("b", None, "kw")
+
+    after = main.get_cascade_stats()
+    assert after["classified"] - before["classified"] == 2
+    assert after["escalated"] - before["escalated"] == 1
+
+    with caplog.at_level(logging.INFO):
+        main.log_cascade_stats(before)
+    assert "Cascade: 1/2 classifications escalated (50%)." in caplog.text
@@ -0,0 +1,168 @@
+import json
+
+import pytest
+import requests
+
+import identity
+from identity import IdentityCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(identity.time, "monotonic", clock)
+    return IdentityCache(**kwargs), clock
+
+
+def test_lru_eviction_keeps_recently_used(monkeypatch):
+    cache, _ = make_cache(monkeypatch, max_entries=2)
+    cache.put("did:plc:a", "a.bsky.social")
+    cache.put("did:plc:b", "b.bsky.social")
+    assert cache.get_did("a.bsky.social") == "did:plc:a"  # touch a so b is least recent
+    cache.put("did:plc:c", "c.bsky.social")
+
+    assert len(cache) == 2
+    assert cache.get_handle("did:plc:b") is None
+    assert cache.get_did("b.bsky.social") is None
+    assert cache.get_handle("did:plc:a") == "a.bsky.social"
+    assert cache.get_handle("did:plc:c") == "c.bsky.social"
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl=60)
+    cache.put("did:plc:a", "a.bsky.social")
+    clock.now += 59
+    assert cache.get_did("a.bsky.social") == "did:plc:a"
+    clock.now += 2
+    assert cache.get_did("a.bsky.social") is None
+    assert cache.get_handle("did:plc:a") is None
+    assert len(cache) == 0
+
+
+def test_handle_lookup_is_case_insensitive(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    cache.put("did:plc:a", "Alice.bsky.social")
+    assert cache.get_did("ALICE.bsky.social") == "did:plc:a"
+    assert cache.get_handle("did:plc:a") == "alice.bsky.social"
+
+
+def test_handle_change_drops_old_handle(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    cache.put("did:plc:a", "old.bsky.social")
+    cache.put("did:plc:a", "new.bsky.social")
+    assert cache.get_did("old.bsky.social") is None
+    assert cache.get_did("new.bsky.social") == "did:plc:a"
+
+
+def test_handle_moved_to_another_did(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    cache.put("did:plc:a", "shared.bsky.social")
+    cache.put("did:plc:b", "shared.bsky.social")
+    assert cache.get_did("shared.bsky.social") == "did:plc:b"
+    # The stale entry for did:plc:a must not claim the handle back
+    assert cache.get_did("shared.bsky.social") == "did:plc:b"
+
+
+def test_resolve_handles_falls_back_when_get_profiles_fails(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    fetched = []
+    monkeypatch.setattr(cache, "_fetch_profiles", lambda actors, token: fetched.extend(actors) or set())
+    monkeypatch.setattr(identity, "_resolve_handle",
+                        lambda handle: "did:plc:a" if handle == "a.bsky.social" else "")
+
+    resolved = cache.resolve_handles(["@a.bsky.social", "gone.bsky.social"], auth_token="token")
+
+    assert fetched == ["a.bsky.social", "gone.bsky.social"]
+    assert resolved == {"a.bsky.social": "did:plc:a"}
+    assert cache.get_did("a.bsky.social") == "did:plc:a"
+
+
+def test_not_found_lookups_are_negatively_cached(monkeypatch):
+    cache, clock = make_cache(monkeypatch, negative_ttl=30)
+    calls = []
+
+    def resolve(handle):
+        calls.append(handle)
+        return ""
+
+    monkeypatch.setattr(identity, "_resolve_handle", resolve)
+
+    assert cache.resolve_handles(["gone.bsky.social"]) == {}
+    assert cache.resolve_handles(["gone.bsky.social"]) == {}
+    assert calls == ["gone.bsky.social"]
+
+    clock.now += 31
+    cache.resolve_handles(["gone.bsky.social"])
+    assert calls == ["gone.bsky.social", "gone.bsky.social"]
+
+
+def test_transport_errors_are_not_negatively_cached(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    calls = []
+
+    def resolve(handle):
+        calls.append(handle)
+        return None
+
+    monkeypatch.setattr(identity, "_resolve_handle", resolve)
+
+    assert cache.resolve_handles(["flaky.bsky.social"]) == {}
+    assert cache.resolve_handles(["flaky.bsky.social"]) == {}
+    assert calls == ["flaky.bsky.social", "flaky.bsky.social"]
+
+
+def test_handle_omitted_by_get_profiles_is_a_miss(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    monkeypatch.setattr(cache, "_fetch_profiles", lambda actors, token: set(actors))
+    calls = []
+    monkeypatch.setattr(identity, "_resolve_handle", lambda handle: calls.append(handle))
+
+    assert cache.resolve_handles(["gone.bsky.social"], auth_token="token") == {}
+    assert calls == []
+    assert cache.is_miss("gone.bsky.social")
+
+
+def test_get_profiles_batches_of_25(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    batches = []
+
+    class Response:
+        def __init__(self, actors):
+            self.actors = actors
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"profiles": [{"did": a, "handle": f"{a.split(':')[-1]}.bsky.social"} for a in self.actors]}
+
+    def fake_get(url, headers, params, timeout):
+        batches.append(len(params["actors"]))
+        return Response(params["actors"])
+
+    monkeypatch.setattr(identity.requests, "get", fake_get)
+    dids = [f"did:plc:user{i}" for i in range(60)]
+    resolved = cache.resolve_dids(dids, auth_token="token")
+    assert batches == [25, 25, 10]
+    assert resolved["did:plc:user59"] == "user59.bsky.social"
+
+
+@pytest.mark.parametrize("status, body, expected", [
+    (200, {"did": "did:plc:a"}, "did:plc:a"),
+    (400, {"error": "InvalidRequest"}, ""),
+    (502, {}, None),
+])
+def test_resolve_handle_distinguishes_not_found_from_errors(monkeypatch, status, body, expected):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode()
+    monkeypatch.setattr(identity.requests, "get", lambda url, params, timeout: response)
+
+    assert identity._resolve_handle("a.bsky.social") == expected
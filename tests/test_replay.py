@@ -0,0 +1,106 @@
+import gzip
+import json
+import logging
+
+import pytest
+
+import main
+from replay import JsonlVerdictSink, iter_replay_posts
+
+
+def write_lines(path, lines):
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        for line in lines:
+            f.write((line if isinstance(line, str) else json.dumps(line)) + "\n")
+
+
+LINES = [
+    {"keyword": "tax", "posts": [{"uri": "at://a/1", "author": {"did": "did:plc:a"}}]},
+    "not json",
+    ["not", "an", "object"],
+    {"posts": ["x", {"uri": "at://b/2", "record": {"text": "About the TAX plan"}}]},
+    {"posts": {"uri": "at://c/3"}},
+    {"uri": "at://d/4", "record": {"text": "nothing relevant"}},
+    {"uri": "at://e/5", "record": "garbage"},
+    "",
+]
+
+
+@pytest.mark.parametrize("name", ["posts.jsonl", "posts.jsonl.gz"])
+def test_parses_plain_and_gzip_and_skips_bad_entries(tmp_path, name):
+    path = tmp_path / name
+    write_lines(path, LINES)
+
+    pairs = list(iter_replay_posts(str(path), ["tax"]))
+
+    assert [(kw, post["uri"]) for kw, post in pairs] == [("tax", "at://a/1"), ("tax", "at://b/2")]
+
+
+def test_default_keyword_applies_to_lines_without_one(tmp_path):
+    path = tmp_path / "posts.jsonl"
+    write_lines(path, LINES)
+
+    pairs = list(iter_replay_posts(str(path), [], default_keyword="budget"))
+
+    assert [(kw, post["uri"]) for kw, post in pairs] == [
+        ("tax", "at://a/1"),
+        ("budget", "at://b/2"),
+        ("budget", "at://d/4"),
+    ]
+
+
+def test_logs_summary_of_skipped_posts(tmp_path, caplog):
+    path = tmp_path / "posts.jsonl"
+    write_lines(path, LINES)
+
+    with caplog.at_level(logging.INFO):
+        list(iter_replay_posts(str(path), []))
+
+    assert "Replayed 1 post(s)" in caplog.text
+    assert "Skipped 5 malformed line(s) or post(s)" in caplog.text
+    assert "Skipped 2 post(s)" in caplog.text
+
+
+def test_verdict_sink_writes_gzip_jsonl(tmp_path):
+    path = tmp_path / "verdicts.jsonl.gz"
+    result = {"is_supportive": True, "intent": "supportive", "reasoning": "r",
+              "model": "deepseek-r1:8b", "escalated": True}
+    with JsonlVerdictSink(str(path)) as sink:
+        sink.write("tax", {"uri": "at://a/1", "author": {"did": "did:plc:a"}}, result)
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        verdicts = [json.loads(line) for line in f]
+    assert verdicts == [{
+        "post_uri": "at://a/1", "authorDid": "did:plc:a", "keyword": "tax",
+        "is_supportive": True, "intent": "supportive", "reasoning": "r",
+        "model": "deepseek-r1:8b", "escalated": True,
+    }]
+
+
+def test_null_author_or_record_does_not_abort_replay(tmp_path, monkeypatch):
+    path = tmp_path / "posts.jsonl.gz"
+    write_lines(path, [
+        {"keyword": "k", "uri": "at://x/1", "author": None, "record": {"text": "hi"}},
+        {"keyword": "k", "uri": "at://y/2", "author": {"did": "did:plc:y"}, "record": None},
+        {"keyword": "k", "uri": "at://z/3", "author": {"did": "did:plc:z"}, "record": {"text": "hi"}},
+    ])
+    monkeypatch.setattr(main, "validate_with_ollama", lambda content, keyword, image_url=None: {
+        "is_supportive": True, "intent": "supportive", "reasoning": "r",
+        "model": "deepseek-r1:8b", "escalated": True,
+    })
+    out = tmp_path / "verdicts.jsonl"
+
+    with JsonlVerdictSink(str(out)) as sink:
+        found = main.monitor_and_block(None, None, posts=iter_replay_posts(str(path), []), sink=sink)
+
+    assert found == ["did:plc:z"]
+    assert [json.loads(line)["post_uri"] for line in out.read_text().splitlines()] == ["at://z/3"]
+
+
+def test_pipeline_reads_null_fields_defensively(monkeypatch):
+    monkeypatch.setattr(main, "validate_with_ollama", lambda *args, **kwargs: pytest.fail("should not classify"))
+
+    found = main.monitor_and_block(None, None, posts=[("k", {"author": None, "record": None, "media": None})])
+
+    assert found == []